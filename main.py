@@ -361,11 +361,10 @@ if __name__ == "__main__":
     # if strategy1(instId, default_df=df):
     #     print(f"{instId} is bullish")
 
-    results = []
+    # 逐个交易对求值并立即输出, 不再累积结果列表
+    # 更大规模的扫描使用 `ctc-filter scan`, 各阶段之间有有界队列
     for item in data:
         instId = item["instId"]
         df = get_candlesticks(instId, bar="1H")
         if strategy1(instId, 10, df):
-            results.append(instId)
-
-    print(results)
+            print(instId, flush=True)
@@ -1,7 +1,11 @@
+import json
 import shutil
+import sys
 from pathlib import Path
+from typing import List, Optional
 
 import typer
+from dotenv import load_dotenv
 from typer import Typer
 from typing_extensions import Annotated
 
@@ -30,3 +34,149 @@ def config(
     p = Path(__file__).parent.joinpath("user_data")
     # 赋值 user_data 到 output
     shutil.copytree(p, Path(output_path).joinpath("user_data"))
+
+
+def _parse_ints(value: str) -> List[int]:
+    """解析逗号分隔的整数列表, 如 "8,12,16" """
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+@app.command("sweep", help="Sweep rule parameters over stored history")
+def sweep(
+    output_path: Annotated[str, typer.Argument(..., help="Output csv path")],
+    data_dir: Annotated[str, typer.Option(help="Candlestick data dir")] = "./data",
+    bar: Annotated[str, typer.Option(help="Candlestick bar")] = "1H",
+    macd_fast: Annotated[str, typer.Option(help="MACD fast periods")] = "12",
+    macd_slow: Annotated[str, typer.Option(help="MACD slow periods")] = "26",
+    macd_signal: Annotated[str, typer.Option(help="MACD signal periods")] = "9",
+    bb_period: Annotated[str, typer.Option(help="BBANDS periods")] = "21",
+    stoch_fastk: Annotated[str, typer.Option(help="STOCH fastk periods")] = "9",
+    stoch_slowk: Annotated[str, typer.Option(help="STOCH slowk periods")] = "3",
+    stoch_slowd: Annotated[str, typer.Option(help="STOCH slowd periods")] = "3",
+    n: Annotated[str, typer.Option(help="Lookback candles")] = "5",
+    workers: Annotated[int, typer.Option(help="Worker processes, 0 for cpu count")] = 0,
+    matches_path: Annotated[
+        Optional[str],
+        typer.Option(help="Also write (params_id, inst_id) pairs to this csv"),
+    ] = None,
+):
+    """Sweep rule parameters over stored history"""
+    from .sweep import build_grid
+    from .sweep import sweep as run_sweep
+
+    grid = build_grid(
+        macd_fast=_parse_ints(macd_fast),
+        macd_slow=_parse_ints(macd_slow),
+        macd_signal=_parse_ints(macd_signal),
+        bb_period=_parse_ints(bb_period),
+        stoch_fastk=_parse_ints(stoch_fastk),
+        stoch_slowk=_parse_ints(stoch_slowk),
+        stoch_slowd=_parse_ints(stoch_slowd),
+        n=_parse_ints(n),
+    )
+    results, matches = run_sweep(
+        grid,
+        data_dir=data_dir,
+        bar=bar,
+        max_workers=workers or None,
+        with_matches=matches_path is not None,
+    )
+    results.to_csv(output_path, index=False)
+    if matches is not None and matches_path is not None:
+        matches.to_csv(matches_path, index=False)
+    typer.echo(f"{len(grid)} parameter sets written to {output_path}")
+
+
+@app.command("scan", help="Scan instruments with the sample rule")
+def scan(
+    tickers_path: Annotated[str, typer.Argument(..., help="Tickers json path")],
+    output_path: Annotated[
+        Optional[str], typer.Option(help="Output file, defaults to stdout")
+    ] = None,
+    bar: Annotated[str, typer.Option(help="Candlestick bar")] = "1H",
+    limit: Annotated[str, typer.Option(help="Candlesticks to fetch")] = "100",
+    window: Annotated[
+        Optional[int],
+        typer.Option(
+            help="Only keep the latest candlesticks per instrument, defaults to "
+            "keeping everything fetched. MACD is seeded within the kept "
+            "candlesticks, so a window shorter than --limit changes the results"
+        ),
+    ] = None,
+    fetch_workers: Annotated[int, typer.Option(help="Fetch threads")] = 4,
+    maxsize: Annotated[int, typer.Option(help="Queue size between stages")] = 16,
+    top_k: Annotated[
+        int, typer.Option(help="Only output the K highest scored instruments")
+    ] = 0,
+):
+    """Scan instruments with the sample rule"""
+    from .downloader._okx import OKXAdapter
+    from .pipeline import Pipeline, decode_window
+    from .pipeline import scan as run_scan
+    from .ranking import top_k as rank_top_k
+    from .user_data.rules.sample import SampleRule
+
+    if window is not None and window < SampleRule.lookback:
+        raise typer.BadParameter(
+            f"must be at least {SampleRule.lookback}", param_hint="--window"
+        )
+
+    load_dotenv()
+    adapter = OKXAdapter()
+
+    def _inst_ids():
+        with open(tickers_path, "r") as f:
+            data = json.load(f)
+        for item in data:
+            yield item["instId"]
+
+    decode = decode_window(window)
+
+    # 单个交易对获取或解码失败时记录并跳过, 不中断整个扫描
+    def _fetch(inst_id: str):
+        try:
+            return inst_id, adapter.get_candlesticks(inst_id, bar=bar, limit=limit)
+        except Exception as e:
+            typer.echo(f"{inst_id}: fetch failed: {e!r}", err=True)
+            return None
+
+    def _decode(item):
+        try:
+            return decode(item)
+        except (KeyError, TypeError, ValueError) as e:
+            typer.echo(f"{item[0]}: decode failed: {e!r}", err=True)
+            return None
+
+    def _evaluate(item):
+        inst_id, df = item
+        return inst_id if SampleRule(df).run() else None
+
+    out = open(output_path, "w") if output_path else sys.stdout
+    if top_k:
+        # 每个交易对只获取一次, 获取与解码并行进行; 排名提前结束时关闭 pipeline
+        pipeline = Pipeline(maxsize=maxsize)
+        pipeline.stage(_fetch, workers=fetch_workers).stage(_decode)
+        items = pipeline.run(_inst_ids())
+        try:
+            for inst_id, score in rank_top_k(items, SampleRule, top_k):
+                out.write(f"{inst_id}\t{score:.4f}\n")
+        finally:
+            items.close()
+            if out is not sys.stdout:
+                out.close()
+        return
+
+    try:
+        for inst_id in run_scan(
+            _inst_ids(),
+            _fetch,
+            _decode,
+            _evaluate,
+            fetch_workers=fetch_workers,
+            maxsize=maxsize,
+        ):
+            out.write(f"{inst_id}\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
@@ -0,0 +1,205 @@
+import queue
+import threading
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+# 阶段结束标记
+_DONE = object()
+
+
+class _Failure:
+    """在阶段之间传递的异常, 由消费者重新抛出"""
+
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+class Pipeline:
+    """基于有界队列的流式处理管道
+
+    每个阶段由若干线程组成, 阶段之间通过有界队列连接. 下游处理不过来时,
+    上游在 put 时阻塞 (背压), 因此同一时刻在内存中的数据条数不超过
+    各队列容量与线程数之和, 与输入总量无关.
+
+    阶段函数返回 None 表示丢弃该条数据.
+
+    Example:
+        >>> pipeline = Pipeline(maxsize=8)
+        >>> pipeline.stage(fetch, workers=4).stage(decode).stage(evaluate)
+        >>> for result in pipeline.run(inst_ids):
+        ...     print(result)
+    """
+
+    def __init__(self, maxsize: int = 16):
+        if maxsize < 1:
+            raise ValueError("maxsize must be greater than 0")
+        self.maxsize = maxsize
+        self._stages: List[Tuple[Callable[[Any], Any], int]] = []
+
+    def stage(self, func: Callable[[Any], Any], workers: int = 1) -> "Pipeline":
+        """添加一个处理阶段
+
+        Args:
+            func: 处理函数, 接收上一阶段的输出
+            workers: 该阶段的线程数, I/O 密集的阶段可以适当调大
+
+        Returns:
+            Pipeline: 自身, 便于链式调用
+        """
+        if workers < 1:
+            raise ValueError("workers must be greater than 0")
+        self._stages.append((func, workers))
+        return self
+
+    @staticmethod
+    def _put(q: queue.Queue, item: Any, stop: threading.Event) -> bool:
+        """向队列放入数据, 管道被关闭时放弃并返回 False"""
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    @classmethod
+    def _feed(
+        cls, source: Iterable[Any], outbox: queue.Queue, stop: threading.Event
+    ) -> None:
+        try:
+            for item in source:
+                if not cls._put(outbox, item, stop):
+                    return
+        except BaseException as e:
+            cls._put(outbox, _Failure(e), stop)
+        cls._put(outbox, _DONE, stop)
+
+    @classmethod
+    def _work(
+        cls,
+        func: Callable[[Any], Any],
+        inbox: queue.Queue,
+        outbox: queue.Queue,
+        stop: threading.Event,
+    ) -> None:
+        while not stop.is_set():
+            try:
+                item = inbox.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                # 放回结束标记, 让同一阶段的其他线程也能退出
+                cls._put(inbox, _DONE, stop)
+                return
+            if isinstance(item, _Failure):
+                result = item
+            else:
+                try:
+                    result = func(item)
+                except BaseException as e:
+                    result = _Failure(e)
+            # 及时释放引用, 避免阻塞在 put 时仍持有上游数据
+            del item
+            if result is not None and not cls._put(outbox, result, stop):
+                return
+
+    @classmethod
+    def _close_stage(
+        cls,
+        threads: List[threading.Thread],
+        outbox: queue.Queue,
+        stop: threading.Event,
+    ) -> None:
+        for t in threads:
+            t.join()
+        cls._put(outbox, _DONE, stop)
+
+    def run(self, source: Iterable[Any]) -> Iterator[Any]:
+        """运行管道, 逐条产出最后一个阶段的结果
+
+        任一阶段抛出的异常会在消费者一侧重新抛出. 提前结束迭代 (break 或 close)
+        会关闭管道, 所有线程在处理完手头的数据后退出.
+
+        Args:
+            source: 输入数据, 可以是惰性的迭代器
+
+        Yields:
+            Any: 最后一个阶段的输出
+        """
+        stop = threading.Event()
+        inbox: queue.Queue = queue.Queue(self.maxsize)
+        threading.Thread(
+            target=self._feed,
+            args=(source, inbox, stop),
+            name="pipeline-feed",
+            daemon=True,
+        ).start()
+        for index, (func, workers) in enumerate(self._stages):
+            outbox: queue.Queue = queue.Queue(self.maxsize)
+            threads = [
+                threading.Thread(
+                    target=self._work,
+                    args=(func, inbox, outbox, stop),
+                    name=f"pipeline-stage{index}-{i}",
+                    daemon=True,
+                )
+                for i in range(workers)
+            ]
+            for t in threads:
+                t.start()
+            threading.Thread(
+                target=self._close_stage,
+                args=(threads, outbox, stop),
+                name=f"pipeline-stage{index}-close",
+                daemon=True,
+            ).start()
+            inbox = outbox
+
+        try:
+            while True:
+                item = inbox.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.exc
+                yield item
+        finally:
+            stop.set()
+
+
+def scan(
+    inst_ids: Iterable[str],
+    fetch: Callable[[str], Any],
+    decode: Callable[[Any], Any],
+    evaluate: Callable[[Any], Any],
+    fetch_workers: int = 4,
+    maxsize: int = 16,
+) -> Iterator[Any]:
+    """流式扫描交易对: fetch → decode → evaluate
+
+    Args:
+        inst_ids: 交易对, 可以是惰性的迭代器
+        fetch: 获取原始数据, 接收交易对, 返回 (交易对, 数据)
+        decode: 解码并截取所需窗口, 返回 (交易对, 数据帧)
+        evaluate: 计算指标并求值规则, 不满足时返回 None
+        fetch_workers: 获取数据的线程数
+        maxsize: 阶段之间队列的容量
+
+    Yields:
+        Any: evaluate 的非空结果, 按完成顺序产出
+    """
+    pipeline = Pipeline(maxsize=maxsize)
+    pipeline.stage(fetch, workers=fetch_workers).stage(decode).stage(evaluate)
+    yield from pipeline.run(inst_ids)
+
+
+def decode_window(window: Optional[int] = None) -> Callable[[Any], Any]:
+    """生成 decode 阶段函数: 将 K 线数据转换为浮点数并只保留最近 window 根"""
+
+    def _decode(item: Any) -> Any:
+        inst_id, df = item
+        if window is not None:
+            df = df.tail(window)
+        df = df[["ts", "open", "high", "low", "close", "volume"]].astype(float)
+        return inst_id, df.reset_index(drop=True)
+
+    return _decode
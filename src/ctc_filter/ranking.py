@@ -0,0 +1,99 @@
+import heapq
+from typing import Any, Callable, Iterable, List, NamedTuple, Optional, Tuple
+
+from pandas import DataFrame
+
+
+class ScoreComponent(NamedTuple):
+    """规则的一个打分项, 得分在 [0, 1] 之间
+
+    Attributes:
+        window: 打分所需的最近 K 线数量, 打分时只传入这一段; None 表示传入完整数据
+        score: 得分, 返回 None 表示不满足规则
+        bound: 得分的上界, 开销应远低于 score; None 表示上界为 1
+    """
+
+    window: Optional[int]
+    score: Callable[[DataFrame], Optional[float]]
+    bound: Optional[Callable[[DataFrame], float]] = None
+
+
+def _components(rule_cls: Any) -> List[ScoreComponent]:
+    """获取规则的打分项, 按所需 K 线数量从少到多排列
+
+    规则可以实现 score_components 返回若干 ScoreComponent;
+    只实现了 run 的规则使用完整数据, 满足时记 1 分.
+    """
+    if hasattr(rule_cls, "score_components"):
+        components = list(rule_cls.score_components())
+    else:
+        components = [
+            ScoreComponent(None, lambda df: 1.0 if rule_cls(df).run() else None)
+        ]
+    return sorted(components, key=lambda c: (c.window is None, c.window or 0))
+
+
+def _evaluate(
+    df: DataFrame,
+    components: List[ScoreComponent],
+    threshold: Optional[float],
+) -> Optional[float]:
+    """计算单个交易对的得分, 上界不超过 threshold 时跳过剩余的打分项
+
+    Returns:
+        Optional[float]: 得分, 不满足规则或无法超过 threshold 时为 None
+    """
+    total = 0.0
+    for i, component in enumerate(components):
+        data = df if component.window is None else df.tail(component.window)
+        upper = 1.0 if component.bound is None else component.bound(data)
+        # 已计算的得分 + 当前项的上界 + 其余每项最多 1 分
+        if threshold is not None and total + upper + len(components) - i - 1 <= threshold:
+            return None
+        value = component.score(data)
+        if value is None:
+            return None
+        total += value
+    return total
+
+
+def top_k(
+    items: Iterable[Tuple[str, DataFrame]],
+    rule_cls: Any,
+    k: int,
+) -> List[Tuple[str, float]]:
+    """按规则得分选出前 K 个交易对
+
+    使用大小为 K 的最小堆保存当前的前 K 名, 堆中最低分即入选门槛. 打分项按所需
+    K 线数量从少到多依次计算, 短窗口的打分项只在数据的最后一段上计算; 已计算的得分
+    加上剩余打分项的上界不超过门槛时, 跳过剩余的打分项. 门槛达到满分时停止迭代
+    items, 上游的 pipeline 随之关闭, 不再获取数据.
+
+    Args:
+        items: (交易对, K 线数据) 的迭代器, 通常来自 pipeline 的 fetch/decode 阶段
+        rule_cls: 规则类, 见 ScoreComponent 与 SampleRule.score_components
+        k: 保留的数量
+
+    Returns:
+        List[Tuple[str, float]]: (交易对, 得分), 按得分从高到低排列
+    """
+    if k < 1:
+        raise ValueError("k must be greater than 0")
+
+    components = _components(rule_cls)
+    max_score = float(len(components))
+    heap: List[Tuple[float, str]] = []
+    for inst_id, df in items:
+        threshold = heap[0][0] if len(heap) == k else None
+        if threshold is not None and threshold >= max_score:
+            break
+        score = _evaluate(df, components, threshold)
+        del df
+        if score is None or (threshold is not None and score <= threshold):
+            continue
+        if len(heap) < k:
+            heapq.heappush(heap, (score, inst_id))
+        else:
+            heapq.heapreplace(heap, (score, inst_id))
+
+    return [(inst_id, score) for score, inst_id in sorted(heap, reverse=True)]
@@ -0,0 +1,253 @@
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import talib as ta
+
+from .user_data.rules.sample import (
+    BBANDS_PERIOD,
+    MACD_FAST,
+    MACD_SIGNAL,
+    MACD_SLOW,
+    STOCH_FASTK,
+    STOCH_SLOWD,
+    STOCH_SLOWK,
+    SampleRule,
+    is_crossed,
+)
+
+
+class SweepParams(NamedTuple):
+    """一个参数组合, 对应 SampleRule 使用的参数"""
+
+    macd_fast: int
+    macd_slow: int
+    macd_signal: int
+    bb_period: int
+    stoch_fastk: int
+    stoch_slowk: int
+    stoch_slowd: int
+    n: int
+
+
+def build_grid(
+    macd_fast: Sequence[int] = (MACD_FAST,),
+    macd_slow: Sequence[int] = (MACD_SLOW,),
+    macd_signal: Sequence[int] = (MACD_SIGNAL,),
+    bb_period: Sequence[int] = (BBANDS_PERIOD,),
+    stoch_fastk: Sequence[int] = (STOCH_FASTK,),
+    stoch_slowk: Sequence[int] = (STOCH_SLOWK,),
+    stoch_slowd: Sequence[int] = (STOCH_SLOWD,),
+    n: Sequence[int] = (SampleRule.n,),
+) -> List[SweepParams]:
+    """生成参数网格, 默认值与 SampleRule 一致
+
+    快线周期不小于慢线周期的 MACD 组合没有意义, 会被跳过.
+    BBANDS 的 nbdev 只影响上下轨, 而规则只用到中轨, 因此不参与网格.
+
+    Returns:
+        List[SweepParams]: 参数组合列表
+    """
+    grid = []
+    for combo in itertools.product(
+        macd_fast,
+        macd_slow,
+        macd_signal,
+        bb_period,
+        stoch_fastk,
+        stoch_slowk,
+        stoch_slowd,
+        n,
+    ):
+        params = SweepParams(*combo)
+        if params.macd_fast >= params.macd_slow:
+            continue
+        grid.append(params)
+    return grid
+
+
+def iter_history(data_dir: str, bar: str = "1H") -> Iterator[Tuple[str, Path]]:
+    """遍历本地保存的 K 线数据
+
+    数据由 OKXAdapter.get_candlesticks 写入 ``{data_dir}/{inst_id}/{bar}/{inst_id}.json``.
+
+    Yields:
+        Tuple[str, Path]: 交易对与对应的数据文件
+    """
+    root = Path(data_dir)
+    if not root.is_dir():
+        return
+    for inst_dir in sorted(root.iterdir()):
+        file_path = inst_dir.joinpath(bar, f"{inst_dir.name}.json")
+        if file_path.is_file():
+            yield inst_dir.name, file_path
+
+
+def load_history(file_path: Path) -> pd.DataFrame:
+    """读取本地 K 线数据, 转换为按时间升序排列的浮点数据帧"""
+    with open(file_path, "r") as f:
+        data = json.load(f)
+    df = pd.DataFrame(data, columns=["ts", "high", "low", "close"]).astype(float)
+    df.sort_values("ts", ascending=True, inplace=True)
+    return df
+
+
+class _IndicatorCache:
+    """单个交易对的指标缓存
+
+    EMA 按 (周期, 起始位置) 缓存: 慢线从头开始计算, 每个慢线周期只算一次;
+    快线与 TA-Lib 一样从第 slow - fast 根 K 线开始计算, 因此每个 (快线, 慢线)
+    组合各算一次, DEA 也按 (fast, slow, signal) 各算一次. BBANDS 中轨由前缀和得到,
+    不同周期共享同一组前缀和. 每个子条件的结果按其自身参数缓存, 因此网格的开销
+    取决于各子条件参数组合的数量之和 (MACD 为 fast × slow × signal), 而不是整个
+    网格的大小.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.high = df["high"].to_numpy()
+        self.low = df["low"].to_numpy()
+        self.close = df["close"].to_numpy()
+        # 减去首个收盘价, 降低前缀和的数值误差
+        self._cumsum = np.concatenate(([0.0], np.cumsum(self.close - self.close[0])))
+        self._ema: Dict[Tuple[int, int], np.ndarray] = {}
+        self._middleband: Dict[int, np.ndarray] = {}
+        self._macd_cond: Dict[Tuple[int, int, int, int], bool] = {}
+        self._boll_cond: Dict[Tuple[int, int], bool] = {}
+        self._kdj_cond: Dict[Tuple[int, int, int, int], bool] = {}
+
+    def ema(self, span: int, offset: int = 0) -> np.ndarray:
+        """从第 offset 根 K 线开始计算的 EMA, 之前的位置为 NaN"""
+        key = (span, offset)
+        if key not in self._ema:
+            values = np.full(len(self.close), np.nan)
+            values[offset:] = ta.EMA(self.close[offset:], timeperiod=span)  # type: ignore
+            self._ema[key] = values
+        return self._ema[key]
+
+    def middleband(self, period: int) -> np.ndarray:
+        if period not in self._middleband:
+            middle = np.full(len(self.close), np.nan)
+            if len(self.close) >= period:
+                sums = self._cumsum[period:] - self._cumsum[:-period]
+                middle[period - 1 :] = sums / period + self.close[0]
+            self._middleband[period] = middle
+        return self._middleband[period]
+
+    def is_golden_cross_macd(self, fast: int, slow: int, signal: int, n: int) -> bool:
+        key = (fast, slow, signal, n)
+        if key not in self._macd_cond:
+            # 与 TA-Lib 的 MACD 保持一致: 快线从第 slow - fast 根 K 线开始计算,
+            # 使快慢线的种子 SMA 结束于同一根 K 线; DIF 在 DEA 有值之前不输出
+            dif = self.ema(fast, slow - fast) - self.ema(slow)
+            dea = ta.EMA(dif, timeperiod=signal)  # type: ignore
+            dif[: slow + signal - 2] = np.nan
+            self._macd_cond[key] = is_crossed(dif, dea, n)
+        return self._macd_cond[key]
+
+    def middleband_inside_candle(self, period: int, n: int) -> bool:
+        key = (period, n)
+        if key not in self._boll_cond:
+            middle = self.middleband(period)[-n:]
+            inside = (self.low[-n:] <= middle) & (middle <= self.high[-n:])
+            self._boll_cond[key] = bool(np.any(inside))
+        return self._boll_cond[key]
+
+    def is_kdj_bullish(self, fastk: int, slowk: int, slowd: int, n: int) -> bool:
+        key = (fastk, slowk, slowd, n)
+        if key not in self._kdj_cond:
+            kdj_k, kdj_d = ta.STOCH(  # type: ignore
+                self.high,
+                self.low,
+                self.close,
+                fastk_period=fastk,
+                slowk_period=slowk,
+                slowk_matype=0,
+                slowd_period=slowd,
+                slowd_matype=0,
+            )
+            self._kdj_cond[key] = is_crossed(kdj_k, kdj_d, n)
+        return self._kdj_cond[key]
+
+    def run(self, params: SweepParams) -> bool:
+        """按 SampleRule.run 的组合方式求值, 任一条件不满足即短路"""
+        return (
+            self.is_golden_cross_macd(
+                params.macd_fast, params.macd_slow, params.macd_signal, params.n
+            )
+            and self.middleband_inside_candle(params.bb_period, params.n)
+            and self.is_kdj_bullish(
+                params.stoch_fastk, params.stoch_slowk, params.stoch_slowd, params.n
+            )
+        )
+
+
+def _sweep_instrument(args: Tuple[str, Path, List[SweepParams]]) -> Tuple[str, bytes]:
+    """在子进程中对单个交易对求值整个参数网格
+
+    Returns:
+        Tuple[str, bytes]: 交易对与每个参数组合是否满足规则的位图
+    """
+    inst_id, file_path, grid = args
+    df = load_history(file_path)
+    if df.empty:
+        return inst_id, bytes(len(grid))
+    cache = _IndicatorCache(df)
+    return inst_id, bytes(cache.run(params) for params in grid)
+
+
+def sweep(
+    grid: List[SweepParams],
+    data_dir: str = "./data",
+    bar: str = "1H",
+    max_workers: Optional[int] = None,
+    with_matches: bool = False,
+) -> Tuple[pd.DataFrame, Optional[pd.DataFrame]]:
+    """在本地保存的全部交易对上求值参数网格
+
+    Args:
+        grid: 参数组合列表, 见 build_grid
+        data_dir: K 线数据目录
+        bar: K 线周期
+        max_workers: 进程数, 默认为 CPU 核数
+        with_matches: 是否同时返回每个参数组合满足规则的交易对
+
+    Returns:
+        Tuple[DataFrame, Optional[DataFrame]]: 第一个表每个参数组合一行, 包含
+        params_id、参数及满足规则的交易对数量; with_matches 为 True 时,
+        第二个表每个 (params_id, inst_id) 一行, 否则为 None
+    """
+    jobs = [(inst_id, path, grid) for inst_id, path in iter_history(data_dir, bar)]
+    counts = np.zeros(len(grid), dtype=np.int64)
+    params_ids: List[np.ndarray] = []
+    inst_ids: List[str] = []
+    if jobs:
+        workers = max_workers or os.cpu_count() or 1
+        chunksize = max(1, len(jobs) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for inst_id, hits in executor.map(
+                _sweep_instrument, jobs, chunksize=chunksize
+            ):
+                mask = np.frombuffer(hits, dtype=np.uint8)
+                counts += mask
+                if with_matches:
+                    ids = np.flatnonzero(mask)
+                    params_ids.append(ids)
+                    inst_ids.extend([inst_id] * len(ids))
+
+    results = pd.DataFrame(grid, columns=list(SweepParams._fields))
+    results.insert(0, "params_id", np.arange(len(grid)))
+    results["matches"] = counts
+    if not with_matches:
+        return results, None
+    matches = pd.DataFrame(
+        {
+            "params_id": np.concatenate(params_ids) if params_ids else [],
+            "inst_id": inst_ids,
+        }
+    )
+    return results, matches
@@ -1,93 +1,219 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
 import pandas as pd
 import talib as ta
 
+from ctc_filter.ranking import ScoreComponent
 
-def is_kdj_bullish(df: pd.DataFrame, n: int = 1) -> bool:
-    """判断是否存在 KDJ 看涨信号(K 大于 D).
+# 指标参数, 规则判断与打分共用
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+BBANDS_PERIOD, BBANDS_NBDEV = 21, 2
+STOCH_FASTK, STOCH_SLOWK, STOCH_SLOWD = 9, 3, 3
+ATR_PERIOD = 14
+# 指标第一个有效值之前的 K 线数量
+BBANDS_LOOKBACK = BBANDS_PERIOD - 1
+STOCH_LOOKBACK = STOCH_FASTK - 1 + STOCH_SLOWK - 1 + STOCH_SLOWD - 1
 
-    Args:
-        instId: 交易对
-        n: 最近 n 根 K 线，默认为 1，即最近 1 根 K 线
-        default_df: K 线数据, 默认为 None, 由调用者传入, 避免重复获取
+
+def macd(df: pd.DataFrame) -> Tuple[pd.Series, pd.Series, pd.Series]:
+    """计算 MACD
 
     Returns:
-        bool: 是否满足规则
+        Tuple[pd.Series, pd.Series, pd.Series]: DIF, DEA 与 MACD 柱状图
+    """
+    assert hasattr(ta, "MACD"), "MACD not found in talib"
+    dif, dea, hist = ta.MACD(  # type: ignore
+        df["close"],
+        fastperiod=MACD_FAST,
+        slowperiod=MACD_SLOW,
+        signalperiod=MACD_SIGNAL,
+    )
+    # NOTE: 交易所中的 macd 的数值都是 * 2 之后的结果
+    return dif, dea, hist * 2
+
+
+def boll(df: pd.DataFrame) -> Tuple[pd.Series, pd.Series, pd.Series]:
+    """计算 Boll
+
+    Returns:
+        Tuple[pd.Series, pd.Series, pd.Series]: 上轨, 中轨与下轨
+    """
+    assert hasattr(ta, "BBANDS"), "BBANDS not found in talib"
+    return ta.BBANDS(  # type: ignore
+        df["close"],
+        timeperiod=BBANDS_PERIOD,
+        nbdevup=BBANDS_NBDEV,
+        nbdevdn=BBANDS_NBDEV,
+        matype=0,
+    )
+
+
+def kdj(df: pd.DataFrame) -> Tuple[pd.Series, pd.Series]:
+    """计算 KDJ
+
+    Returns:
+        Tuple[pd.Series, pd.Series]: K 与 D
     """
-    # 计算 KDJ
     assert hasattr(ta, "STOCH"), "STOCH not found in talib"
-    kdj_k, kdj_d = ta.STOCH(  # type: ignore
+    return ta.STOCH(  # type: ignore
         df["high"],
         df["low"],
         df["close"],
-        fastk_period=9,
-        slowk_period=3,
+        fastk_period=STOCH_FASTK,
+        slowk_period=STOCH_SLOWK,
         slowk_matype=0,
-        slowd_period=3,
+        slowd_period=STOCH_SLOWD,
         slowd_matype=0,
-    )  # type: ignore
-
-    # 出现一次 dif < dea, 这根 K 线之后出现 dif > dea
-    k_lt_d = False
-    k_lt_d_index = 0
-    for i in range(len(kdj_k) - 1, len(kdj_k) - n - 1, -1):
-        if kdj_k.iloc[i] < kdj_d.iloc[i]:
-            k_lt_d = True
-            k_lt_d_index = i
-            break
-
-    if not k_lt_d:
-        return False
-
-    # 从 dif_lt_dea_index 开始找到 dif > dea 的 K 线
-    for j in range(k_lt_d_index, len(kdj_k), 1):
-        if kdj_k.iloc[j] > kdj_d.iloc[j]:
-            return True
+    )
+
 
+def atr(df: pd.DataFrame) -> pd.Series:
+    """计算 ATR, 用于将价格差归一化"""
+    assert hasattr(ta, "ATR"), "ATR not found in talib"
+    return ta.ATR(  # type: ignore
+        df["high"], df["low"], df["close"], timeperiod=ATR_PERIOD
+    )
+
+
+def is_crossed(fast, slow, n: int) -> bool:
+    """最近 n 根 K 线内出现一次 fast < slow, 且这根 K 线之后出现 fast > slow
+
+    Args:
+        fast: 快线, Series 或数组
+        slow: 慢线, Series 或数组
+        n: 最近 n 根 K 线
+    """
+    fast = np.asarray(fast, dtype=float)
+    slow = np.asarray(slow, dtype=float)
+    for i in range(len(fast) - 1, max(len(fast) - n, 0) - 1, -1):
+        if fast[i] < slow[i]:
+            return bool(np.any(fast[i:] > slow[i:]))
     return False
 
 
+def _cross_strength(fast: float, slow: float) -> float:
+    """(fast - slow) / (|fast| + |slow|), 限制在 [0, 1] 之间, NaN 视为 0"""
+    scale = abs(fast) + abs(slow)
+    if not scale or scale != scale:
+        return 0.0
+    return min(max((fast - slow) / scale, 0.0), 1.0)
+
+
+def _relative_gap(fast: float, slow: float, scale: float) -> float:
+    """(fast - slow) / (fast - slow + scale), fast 不大于 slow 或 NaN 时为 0
+
+    scale 为正时得分严格小于 1, 差值等于 scale 时为 0.5.
+    """
+    gap = fast - slow
+    if not gap > 0 or not scale > 0:
+        return 0.0
+    return gap / (gap + scale)
+
+
+def _closeness(close: float, middle: float, upper: float) -> float:
+    """收盘价与中轨的接近程度, 1 表示正好在中轨上, 0 表示到达上轨或下轨"""
+    width = upper - middle
+    if width != width:
+        return 0.0
+    if not width:
+        return 1.0
+    return min(max(1 - abs(close - middle) / width, 0.0), 1.0)
+
+
+def golden_cross_macd_score(df: pd.DataFrame, n: int = 1) -> Optional[float]:
+    """MACD 金叉强度, 即最新一根 K 线上 DIF 高出 DEA 的幅度相对 ATR 的大小.
+
+    得分为 (DIF - DEA) / (DIF - DEA + ATR), 按 ATR 归一化后不同价位的交易对可以比较,
+    也不会像按 |DIF| + |DEA| 归一化那样在 DIF 与 DEA 分居零轴两侧时饱和为 1.
+
+    Args:
+        df: K 线数据
+        n: 最近 n 根 K 线，默认为 1，即最近 1 根 K 线
+
+    Returns:
+        Optional[float]: 不满足 is_golden_cross_macd 时为 None, 否则为 [0, 1] 之间的得分
+    """
+    dif, dea, _ = macd(df)
+    if not is_crossed(dif, dea, n):
+        return None
+    return _relative_gap(dif.iloc[-1], dea.iloc[-1], atr(df).iloc[-1])
+
+
+def middleband_inside_candle_score(df: pd.DataFrame, n: int = 1) -> Optional[float]:
+    """收盘价与 Boll 中轨的接近程度, 1 表示收盘价正好在中轨上, 0 表示到达上轨或下轨.
+
+    Args:
+        df: K 线数据
+        n: 时间范围, 默认为 1, 表示最近 1 根 K 线
+
+    Returns:
+        Optional[float]: 不满足 middleband_inside_candle 时为 None, 否则为 [0, 1] 之间的得分
+    """
+    upperband, middleband, _ = boll(df)
+    low = df["low"].iloc[-n:].astype(float)
+    high = df["high"].iloc[-n:].astype(float)
+    middle = middleband.iloc[-n:]
+    if not ((low <= middle) & (middle <= high)).any():
+        return None
+    return _closeness(
+        float(df["close"].iloc[-1]), middleband.iloc[-1], upperband.iloc[-1]
+    )
+
+
+def kdj_bullish_score(df: pd.DataFrame, n: int = 1) -> Optional[float]:
+    """KDJ 金叉强度, 即最新一根 K 线上 (K - D) / (K + D).
+
+    Args:
+        df: K 线数据
+        n: 最近 n 根 K 线，默认为 1，即最近 1 根 K 线
+
+    Returns:
+        Optional[float]: 不满足 is_kdj_bullish 时为 None, 否则为 [0, 1] 之间的得分
+    """
+    kdj_k, kdj_d = kdj(df)
+    if not is_crossed(kdj_k, kdj_d, n):
+        return None
+    return _cross_strength(kdj_k.iloc[-1], kdj_d.iloc[-1])
+
+
+def is_kdj_bullish(df: pd.DataFrame, n: int = 1) -> bool:
+    """判断是否存在 KDJ 看涨信号(K 大于 D).
+
+    Args:
+        df: K 线数据
+        n: 最近 n 根 K 线，默认为 1，即最近 1 根 K 线
+
+    Returns:
+        bool: 是否满足规则
+    """
+    return kdj_bullish_score(df, n) is not None
+
+
 def middleband_inside_candle(df: pd.DataFrame, n: int = 1) -> bool:
     """判断中轨是否在 K 线内部
 
     Args:
-        instId: 交易对
+        df: K 线数据
         n: 时间范围, 默认为 1, 表示最近 1 根 K 线
-        default_df: K 线数据, 默认为 None, 由调用者传入, 避免重复获取
 
     Returns:
         bool: 是否满足规则
     """
-    # 计算 Boll
-    assert hasattr(ta, "BBANDS"), "BBANDS not found in talib"
-    _, middleband, _ = ta.BBANDS(  # type: ignore
-        df["close"], timeperiod=21, nbdevup=2, nbdevdn=2, matype=0
-    )
-    for i in range(1, n + 1):
-        if (
-            float(df["low"].iloc[-i])
-            <= middleband.iloc[-i]
-            <= float(df["high"].iloc[-i])
-        ):
-            return True
-    return False
+    return middleband_inside_candle_score(df, n) is not None
 
 
 def is_boll_bullish(df: pd.DataFrame, n: int = 1) -> bool:
     """判断是否存在 Boll 看涨信号(收盘价大于中轨且小于上轨).
 
     Args:
-        instId: 交易对
+        df: K 线数据
         n: 时间范围, 默认为 1, 表示最近 1 根 K 线
-        default_df: K 线数据, 默认为 None, 由调用者传入, 避免重复获取
 
     Returns:
         bool: 是否满足规则
     """
-    # 计算 Boll
-    assert hasattr(ta, "BBANDS"), "BBANDS not found in talib"
-    upperband, middleband, _ = ta.BBANDS(  # type: ignore
-        df["close"], timeperiod=21, nbdevup=2, nbdevdn=2, matype=0
-    )
+    upperband, middleband, _ = boll(df)
     for i in range(1, n + 1):
         if (
             float(df["close"].iloc[-i]) > middleband.iloc[-i]
@@ -102,20 +228,14 @@ def is_zero_axis_golden_cross(df: pd.DataFrame, n: int = 1) -> bool:
     """判断是否存在零轴金叉信号(MACD 柱状图由负变正).
 
     Args:
-        instId: 交易对
+        df: K 线数据
         n: 默认为 1, 表示最近 1 个 K 线
-        default_df: K 线数据, 默认为 None, 由调用者传入, 避免重复获取
     """
-    # 计算 MACD
-    assert hasattr(ta, "MACD"), "MACD not found in talib"
-    dif, dea, macd = ta.MACD(df["close"], fastperiod=12, slowperiod=26, signalperiod=9)  # type: ignore
-    # NOTE: 交易所中的 macd 的数值都是 * 2 之后的结果
-    macd = macd * 2
-
+    dif, dea, hist = macd(df)
     for i in range(1, n + 1):
         if (
-            macd.iloc[-i] > 0
-            and macd.iloc[-i - 1] < 0
+            hist.iloc[-i] > 0
+            and hist.iloc[-i - 1] < 0
             and dif.iloc[-i] > dea.iloc[-i]
             and dif.iloc[-i - 1] < dea.iloc[-i - 1]
         ):
@@ -130,39 +250,29 @@ def is_golden_cross_macd(
     """判断是否存在 MACD 看涨信号(DIF 大于 DEA 且 MACD 柱状图大于 0).
 
     Args:
-        instId: 交易对
+        df: K 线数据
         n: 最近 n 根 K 线，默认为 1，即最近 1 根 K 线
-        default_df: K 线数据, 默认为 None, 由调用者传入, 避免重复获取
 
     Returns:
         bool: 是否满足规则
     """
-    # 计算 MACD
-    assert hasattr(ta, "MACD"), "MACD not found in talib"
-    dif, dea, macd = ta.MACD(df["close"], fastperiod=12, slowperiod=26, signalperiod=9)  # type: ignore
-    # NOTE: 交易所中的 macd 的数值都是 * 2 之后的结果
-    macd = macd * 2
-    # 出现一次 dif < dea, 这根 K 线之后出现 dif > dea
-    dif_lt_dea_flag = False
-    dif_lt_dea_index = 0
-    for i in range(len(dif) - 1, len(dif) - n - 1, -1):
-        if dif.iloc[i] < dea.iloc[i]:
-            dif_lt_dea_flag = True
-            dif_lt_dea_index = i
-            break
-
-    if not dif_lt_dea_flag:
-        return False
-
-    # 从 dif_lt_dea_index 开始找到 dif > dea 的 K 线
-    for j in range(dif_lt_dea_index, len(dif), 1):
-        if dif.iloc[j] > dea.iloc[j]:
-            return True
-
-    return False
+    return golden_cross_macd_score(df, n) is not None
 
 
 class SampleRule:
+    #: 最近 n 根 K 线
+    n = 5
+    #: 各指标在最近 n 根 K 线上都有值所需的最少 K 线数量. 不包含 EMA 的预热,
+    #: 只保留这么多 K 线时 MACD 的数值与完整历史上的不同
+    lookback = (
+        max(
+            MACD_SLOW + MACD_SIGNAL,
+            BBANDS_PERIOD,
+            STOCH_FASTK + STOCH_SLOWK + STOCH_SLOWD,
+        )
+        + n
+    )
+
     def __init__(self, df: pd.DataFrame):
         self.df = df
 
@@ -172,8 +282,42 @@ class SampleRule:
         Returns:
             bool: 是否满足规则
         """
-        n = 5
-        cond1 = is_golden_cross_macd(self.df, n)
-        cond2 = middleband_inside_candle(self.df, n)
-        cond3 = is_kdj_bullish(self.df, n)
-        return cond1 and cond2 and cond3
+        return self.score() is not None
+
+    @classmethod
+    def score_components(cls) -> List[ScoreComponent]:
+        """打分项
+
+        Boll 与 KDJ 只依赖最近若干根 K 线, 在这一小段上计算, 结果与完整数据上的相同;
+        MACD 的 EMA 依赖完整数据, 没有更便宜的上界, 排名时放在最后,
+        前两项已决定无法进入前 K 名时不再计算.
+
+        Returns:
+            List[ScoreComponent]: 打分项列表
+        """
+        n = cls.n
+        return [
+            ScoreComponent(
+                BBANDS_LOOKBACK + n,
+                lambda df: middleband_inside_candle_score(df, n),
+            ),
+            ScoreComponent(
+                STOCH_LOOKBACK + n,
+                lambda df: kdj_bullish_score(df, n),
+            ),
+            ScoreComponent(None, lambda df: golden_cross_macd_score(df, n)),
+        ]
+
+    def score(self) -> Optional[float]:
+        """运行规则并打分
+
+        Returns:
+            Optional[float]: 不满足规则时为 None, 否则为各打分项之和
+        """
+        total = 0.0
+        for component in self.score_components():
+            value = component.score(self.df)
+            if value is None:
+                return None
+            total += value
+        return total
@@ -0,0 +1,17 @@
+import numpy as np
+import pandas as pd
+
+
+def make_candles(length: int, seed: int) -> pd.DataFrame:
+    """生成随机游走的 K 线数据"""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, length))
+    spread = rng.uniform(0.1, 1.5, length)
+    return pd.DataFrame(
+        {
+            "ts": np.arange(length, dtype=float),
+            "high": close + spread,
+            "low": close - spread,
+            "close": close,
+        }
+    )
@@ -0,0 +1,90 @@
+import json
+
+import pandas as pd
+import pytest
+from typer.testing import CliRunner
+
+import ctc_filter.downloader._okx as okx
+from ctc_filter.cli import app
+from ctc_filter.user_data.rules.sample import SampleRule
+from tests.helpers import make_candles
+
+runner = CliRunner()
+
+
+class FakeAdapter:
+    """返回与 OKX 相同格式 (字符串) 的 K 线数据"""
+
+    frames = {f"INST{seed}-USDT": make_candles(100, seed) for seed in range(300)}
+
+    def get_candlesticks(self, inst_id, bar="1H", limit="100", **kwargs):
+        df = self.frames[inst_id].tail(int(limit)).copy()
+        df["open"] = df["close"]
+        df["volume"] = 1.0
+        for column in ("volCcy", "volCcyQuote", "_"):
+            df[column] = 0
+        return df.astype(str)
+
+
+@pytest.fixture
+def tickers(tmp_path, monkeypatch):
+    monkeypatch.setattr(okx, "OKXAdapter", FakeAdapter)
+    path = tmp_path / "tickers.json"
+    path.write_text(json.dumps([{"instId": inst_id} for inst_id in FakeAdapter.frames]))
+    return str(path)
+
+
+def test_scan_matches_rule_on_full_history(tickers):
+    expected = {
+        inst_id
+        for inst_id, df in FakeAdapter.frames.items()
+        if SampleRule(df).run()
+    }
+    assert expected
+
+    result = runner.invoke(app, ["scan", tickers])
+    assert result.exit_code == 0, result.output
+    assert set(result.output.split()) == expected
+
+
+def test_scan_skips_instruments_that_fail(tickers, monkeypatch):
+    broken = {"INST3-USDT", "INST7-USDT"}
+    bad_data = {"INST5-USDT"}
+    original = FakeAdapter.get_candlesticks
+
+    def get_candlesticks(self, inst_id, bar="1H", limit="100", **kwargs):
+        if inst_id in broken:
+            raise ConnectionError("timeout")
+        df = original(self, inst_id, bar, limit)
+        if inst_id in bad_data:
+            df["close"] = "n/a"
+        return df
+
+    monkeypatch.setattr(FakeAdapter, "get_candlesticks", get_candlesticks)
+    expected = {
+        inst_id
+        for inst_id, df in FakeAdapter.frames.items()
+        if inst_id not in broken | bad_data and SampleRule(df).run()
+    }
+
+    result = runner.invoke(app, ["scan", tickers])
+    assert result.exit_code == 0, result.output
+    assert set(result.stdout.split()) == expected
+    for inst_id in broken | bad_data:
+        assert inst_id in result.stderr
+
+
+def test_scan_top_k_ranks_on_full_history(tickers):
+    scores = []
+    for inst_id, df in FakeAdapter.frames.items():
+        score = SampleRule(df).score()
+        if score is not None:
+            scores.append((score, inst_id))
+    expected = sorted(scores, reverse=True)[:5]
+
+    result = runner.invoke(app, ["scan", tickers, "--top-k", "5"])
+    assert result.exit_code == 0, result.output
+    rows = [line.split("\t") for line in result.stdout.splitlines()]
+    assert [inst_id for inst_id, _ in rows] == [inst_id for _, inst_id in expected]
+    for (_, score), (want, _) in zip(rows, expected):
+        assert float(score) == pytest.approx(want, abs=1e-4)
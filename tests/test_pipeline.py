@@ -0,0 +1,102 @@
+import itertools
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ctc_filter.pipeline import Pipeline, decode_window, scan
+
+
+def pipeline_threads():
+    return [t for t in threading.enumerate() if t.name.startswith("pipeline-")]
+
+
+def wait_for_threads(timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while pipeline_threads() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return pipeline_threads()
+
+
+def test_run_yields_stage_results_and_drops_none():
+    pipeline = Pipeline(maxsize=2)
+    pipeline.stage(lambda x: x * 2, workers=3).stage(
+        lambda x: x if x % 3 == 0 else None
+    )
+    assert sorted(pipeline.run(range(30))) == [x for x in range(0, 60, 6)]
+    assert wait_for_threads() == []
+
+
+def test_backpressure_bounds_items_in_flight():
+    fed = itertools.count()
+    maxsize, workers = 2, 3
+
+    def source():
+        while True:
+            next(fed)
+            yield 0
+
+    pipeline = Pipeline(maxsize=maxsize)
+    pipeline.stage(lambda x: x, workers=workers).stage(lambda x: x)
+    results = pipeline.run(source())
+    consumed = 0
+    for _ in range(5):
+        next(results)
+        consumed += 1
+        time.sleep(0.2)
+    in_flight = next(fed) - consumed
+    # feed 线程手上 1 条, 每个阶段的线程各 1 条, 外加每个队列 maxsize 条
+    assert in_flight <= 1 + maxsize + (workers + maxsize) + (1 + maxsize)
+    results.close()
+    assert wait_for_threads() == []
+
+
+def test_stage_exception_reaches_caller():
+    def fail(x):
+        if x == 5:
+            raise ValueError("boom")
+        return x
+
+    with pytest.raises(ValueError, match="boom"):
+        list(Pipeline().stage(fail, workers=2).run(range(10)))
+    assert wait_for_threads() == []
+
+
+def test_source_exception_reaches_caller():
+    def source():
+        yield 1
+        raise RuntimeError("source failed")
+
+    with pytest.raises(RuntimeError, match="source failed"):
+        list(Pipeline().stage(lambda x: x).run(source()))
+    assert wait_for_threads() == []
+
+
+def test_close_stops_worker_threads():
+    pipeline = Pipeline(maxsize=1)
+    pipeline.stage(lambda x: x, workers=4).stage(lambda x: x)
+    results = pipeline.run(itertools.count())
+    assert next(results) is not None
+    assert pipeline_threads()
+    results.close()
+    assert wait_for_threads() == []
+
+
+def test_scan_with_decode_window():
+    def fetch(inst_id):
+        rows = [[str(i), "1", "2", "0.5", str(i), "10"] for i in range(100)]
+        df = pd.DataFrame(rows, columns=["ts", "open", "high", "low", "close", "volume"])
+        return inst_id, df
+
+    def evaluate(item):
+        inst_id, df = item
+        assert len(df) == 40
+        assert df["close"].dtype == np.float64
+        assert df["close"].iloc[-1] == 99.0
+        return inst_id
+
+    inst_ids = [f"INST{i}" for i in range(10)]
+    results = scan(inst_ids, fetch, decode_window(40), evaluate, fetch_workers=2)
+    assert sorted(results) == sorted(inst_ids)
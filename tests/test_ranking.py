@@ -0,0 +1,131 @@
+import itertools
+from typing import Dict
+
+import pandas as pd
+import pytest
+
+from ctc_filter.ranking import ScoreComponent, top_k
+from ctc_filter.user_data.rules.sample import SampleRule
+from tests.helpers import make_candles
+
+
+@pytest.fixture(scope="module")
+def frames() -> Dict[str, pd.DataFrame]:
+    return {f"INST{seed}": make_candles(100, seed) for seed in range(600)}
+
+
+def brute_force(frames: Dict[str, pd.DataFrame], k: int):
+    scores = []
+    for inst_id, df in frames.items():
+        score = SampleRule(df).score()
+        if score is not None:
+            scores.append((score, inst_id))
+    return [(inst_id, score) for score, inst_id in sorted(scores, reverse=True)[:k]]
+
+
+@pytest.mark.parametrize("k", [1, 5, 20])
+def test_top_k_matches_brute_force(frames, k):
+    expected = brute_force(frames, k)
+    result = top_k(frames.items(), SampleRule, k)
+    assert [inst_id for inst_id, _ in result] == [inst_id for inst_id, _ in expected]
+    for (_, score), (_, want) in zip(result, expected):
+        assert score == pytest.approx(want)
+
+
+def test_short_window_components_see_only_their_window(frames):
+    seen = []
+
+    class WindowRule:
+        @classmethod
+        def score_components(cls):
+            return [
+                ScoreComponent(None, lambda df: seen.append(len(df)) or 0.0),
+                ScoreComponent(10, lambda df: seen.append(len(df)) or 0.0),
+            ]
+
+    top_k(itertools.islice(frames.items(), 1), WindowRule, 1)
+    assert seen == [10, 100]
+
+
+def test_top_k_skips_macd_when_it_cannot_matter(frames):
+    calls = {"macd": 0}
+    boll, kdj, macd = SampleRule.score_components()
+
+    def counting_macd(df):
+        calls["macd"] += 1
+        return macd.score(df)
+
+    class CountingRule(SampleRule):
+        @classmethod
+        def score_components(cls):
+            return [boll, kdj, macd._replace(score=counting_macd)]
+
+    top_k(frames.items(), CountingRule, 1)
+    passed_short = sum(
+        boll.score(df) is not None and kdj.score(df) is not None
+        for df in frames.values()
+    )
+    # Boll/KDJ 已不满足或与 MACD 的满分相加也进不了前 K 名时, 不计算 MACD
+    assert calls["macd"] < passed_short
+
+
+class FixedRule:
+    """每个交易对的得分由数据中的 a, b 两列给出, b 的上界由 c 列给出"""
+
+    calls = []
+
+    @classmethod
+    def score_components(cls):
+        def score_b(df):
+            cls.calls.append(df["id"].iloc[-1])
+            return df["b"].iloc[-1]
+
+        return [
+            ScoreComponent(1, lambda df: df["a"].iloc[-1]),
+            ScoreComponent(None, score_b, lambda df: df["c"].iloc[-1]),
+        ]
+
+
+def fixed_items(scores):
+    for i, (a, b, c) in enumerate(scores):
+        yield f"INST{i}", pd.DataFrame({"id": [i], "a": [a], "b": [b], "c": [c]})
+
+
+def test_bound_prunes_expensive_component():
+    FixedRule.calls = []
+    scores = [
+        (1.0, 1.0, 1.0),
+        (1.0, 0.9, 1.0),
+        (0.5, 1.0, 1.0),  # a + 1 <= 1.9, 不计算 b
+        (1.0, 0.5, 0.8),  # a + c <= 1.9, 不计算 b
+        (1.0, 0.95, 1.0),
+    ]
+    result = top_k(fixed_items(scores), FixedRule, 2)
+    assert result == [("INST0", 2.0), ("INST4", 1.95)]
+    assert FixedRule.calls == [0, 1, 4]
+
+
+def test_stops_iterating_once_threshold_is_max_score():
+    consumed = itertools.count()
+
+    def items():
+        for item in fixed_items([(1.0, 1.0, 1.0)] * 3 + [(0.0, 0.0, 0.0)] * 10):
+            next(consumed)
+            yield item
+
+    result = top_k(items(), FixedRule, 3)
+    assert [score for _, score in result] == [2.0, 2.0, 2.0]
+    assert next(consumed) == 4
+
+
+def test_rule_without_components_falls_back_to_run(frames):
+    class BoolRule:
+        def __init__(self, df):
+            self.df = df
+
+        def run(self):
+            return SampleRule(self.df).run()
+
+    result = top_k(frames.items(), BoolRule, 3)
+    assert len(result) == 3
+    assert all(score == 1.0 for _, score in result)
@@ -0,0 +1,14 @@
+from ctc_filter.user_data.rules.sample import golden_cross_macd_score
+from tests.helpers import make_candles
+
+
+def test_macd_score_does_not_saturate():
+    scores = [
+        score
+        for seed in range(2000)
+        if (score := golden_cross_macd_score(make_candles(100, seed), 5)) is not None
+    ]
+    assert len(scores) > 100
+    assert all(0 <= score < 1 for score in scores)
+    top = sorted(scores, reverse=True)[:20]
+    assert len(set(top)) == len(top)
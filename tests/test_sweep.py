@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+import talib as ta
+
+from ctc_filter.sweep import SweepParams, _IndicatorCache, build_grid, sweep
+from ctc_filter.user_data.rules.sample import SampleRule
+from tests.helpers import make_candles
+
+
+def crossed(fast: np.ndarray, slow: np.ndarray, n: int) -> bool:
+    for i in range(len(fast) - 1, len(fast) - n - 1, -1):
+        if fast[i] < slow[i]:
+            return any(fast[j] > slow[j] for j in range(i, len(fast)))
+    return False
+
+
+def reference_run(df: pd.DataFrame, params: SweepParams) -> bool:
+    """直接调用 TA-Lib 的参考实现"""
+    high, low, close = (df[c].to_numpy() for c in ("high", "low", "close"))
+    dif, dea, _ = ta.MACD(
+        close,
+        fastperiod=params.macd_fast,
+        slowperiod=params.macd_slow,
+        signalperiod=params.macd_signal,
+    )
+    _, middle, _ = ta.BBANDS(close, timeperiod=params.bb_period, matype=0)
+    kdj_k, kdj_d = ta.STOCH(
+        high,
+        low,
+        close,
+        fastk_period=params.stoch_fastk,
+        slowk_period=params.stoch_slowk,
+        slowk_matype=0,
+        slowd_period=params.stoch_slowd,
+        slowd_matype=0,
+    )
+    n = params.n
+    inside = (low[-n:] <= middle[-n:]) & (middle[-n:] <= high[-n:])
+    return crossed(dif, dea, n) and bool(inside.any()) and crossed(kdj_k, kdj_d, n)
+
+
+@pytest.mark.parametrize("length", [45, 60, 100, 300])
+def test_default_grid_matches_sample_rule(length):
+    params = build_grid()[0]
+    for seed in range(300):
+        df = make_candles(length, seed)
+        assert _IndicatorCache(df).run(params) == SampleRule(df).run()
+
+
+@pytest.mark.parametrize("length", [45, 100])
+def test_grid_matches_talib(length):
+    grid = build_grid(
+        macd_fast=(8, 12, 20, 24),
+        macd_slow=(26, 40, 52),
+        macd_signal=(9, 18),
+        bb_period=(14, 21),
+        n=(1, 5, 10),
+    )
+    for seed in range(30):
+        df = make_candles(length, seed)
+        cache = _IndicatorCache(df)
+        for params in grid:
+            assert cache.run(params) == reference_run(df, params), params
+
+
+def test_build_grid_skips_invalid_macd():
+    grid = build_grid(macd_fast=(12, 26, 30), macd_slow=(26,))
+    assert [p.macd_fast for p in grid] == [12]
+
+
+def test_sweep_writes_counts_and_optional_matches(tmp_path):
+    for seed in range(40):
+        inst_id = f"INST{seed}-USDT"
+        df = make_candles(100, seed)
+        dst = tmp_path / inst_id / "1H"
+        dst.mkdir(parents=True)
+        df.astype(str).to_json(dst / f"{inst_id}.json", orient="records")
+    grid = build_grid(n=(1, 5, 10))
+
+    results, matches = sweep(grid, data_dir=str(tmp_path), max_workers=1)
+    assert matches is None
+    assert list(results["params_id"]) == [0, 1, 2]
+    assert "inst_ids" not in results
+
+    results, matches = sweep(
+        grid, data_dir=str(tmp_path), max_workers=1, with_matches=True
+    )
+    assert matches is not None and not matches.empty
+    counts = matches.groupby("params_id").size()
+    for params_id, count in results[["params_id", "matches"]].itertuples(index=False):
+        assert counts.get(params_id, 0) == count